@@ -3,23 +3,37 @@ PhD Interest Email - Multi-Agent System using LangGraph
 Proper agentic workflow using LangGraph (research -> compose -> HITL -> send).
 """
 
+import asyncio
+import email.policy
+import hashlib
+import json
+import math
 import os
+import re
 import smtplib
 import ssl
+import sys
+import threading
+import time
 from email.message import EmailMessage
-from typing import TypedDict, Annotated, Literal
+from collections import OrderedDict
+from email.utils import getaddresses
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import TypedDict, Annotated, Literal, Optional
 import operator
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dotenv import load_dotenv
 
 from langgraph.graph import StateGraph, END, START
 from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
+from langchain_core.runnables import RunnableConfig
 
 
 # =============================================================================
@@ -28,6 +42,93 @@ from langchain_anthropic import ChatAnthropic
 load_dotenv()
 
 
+# =============================================================================
+# SHARED HTTP SESSION
+# =============================================================================
+# One pooled session for all scrapers so repeat requests reuse the TCP/TLS
+# connection (HTTP keep-alive) instead of handshaking on every call.
+_HTTP = requests.Session()
+_HTTP.headers.update(
+    {
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36",
+        "Accept": "text/html",
+        # gzip/deflate (+ br when brotli is installed): only encodings requests can decode
+        "Accept-Encoding": requests.utils.DEFAULT_ACCEPT_ENCODING,
+    }
+)
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    # Ignore Retry-After: a 429/503 may ask for hours, which the 15s request timeout doesn't cover
+    max_retries=Retry(
+        total=2,
+        backoff_factor=0.3,
+        status_forcelist=[429, 502, 503, 504],
+        respect_retry_after_header=False,
+    ),
+)
+_HTTP.mount("http://", _adapter)
+_HTTP.mount("https://", _adapter)
+
+
+# =============================================================================
+# SCRAPE CACHE
+# =============================================================================
+# Parsed scraper output is cached in memory and on disk (24h TTL), so re-runs
+# during HITL iteration don't re-fetch the same professor pages.
+_CACHE_DIR = Path(".scrape_cache")
+_CACHE_TTL = 24 * 60 * 60
+_SCRAPE_MEMO_SIZE = 128
+_SCRAPE_MEMO: "OrderedDict[str, dict]" = OrderedDict()
+_SCRAPE_MEMO_LOCK = threading.Lock()
+
+
+def _cache_key(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+def _memo_put(key: str, entry: dict) -> None:
+    # LRU: most recently used last, evict from the front past _SCRAPE_MEMO_SIZE
+    with _SCRAPE_MEMO_LOCK:
+        _SCRAPE_MEMO[key] = entry
+        _SCRAPE_MEMO.move_to_end(key)
+        while len(_SCRAPE_MEMO) > _SCRAPE_MEMO_SIZE:
+            _SCRAPE_MEMO.popitem(last=False)
+
+
+def _cache_get(url: str):
+    key = _cache_key(url)
+    entry = _SCRAPE_MEMO.get(key)
+    if entry is None:
+        try:
+            entry = json.loads((_CACHE_DIR / f"{key}.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+    try:
+        expired = time.time() - entry["stored_at"] > _CACHE_TTL
+        if not isinstance(entry["value"], dict):
+            raise TypeError("cached value is not a dict")
+    except (KeyError, TypeError):
+        expired = True  # malformed / older-format entry: treat as a miss
+    if expired:
+        with _SCRAPE_MEMO_LOCK:
+            _SCRAPE_MEMO.pop(key, None)
+        return None
+    _memo_put(key, entry)
+    return json.loads(json.dumps(entry["value"]))
+
+
+def _cache_set(url: str, value: dict) -> None:
+    key = _cache_key(url)
+    entry = {"stored_at": time.time(), "value": value}
+    _memo_put(key, entry)
+    try:
+        _CACHE_DIR.mkdir(exist_ok=True)
+        (_CACHE_DIR / f"{key}.json").write_text(json.dumps(entry), encoding="utf-8")
+    except OSError as e:
+        print(f"  [CACHE] Could not write scrape cache: {e}")
+
+
 # =============================================================================
 # STATE DEFINITION
 # =============================================================================
@@ -58,111 +159,156 @@ class AgentState(TypedDict):
 # =============================================================================
 # TOOLS / FUNCTIONS
 # =============================================================================
+_KEYWORDS = (
+    "supply chain",
+    "logistics",
+    "revenue management",
+    "pricing",
+    "optimization",
+    "operations research",
+    "network simulation",
+    "healthcare",
+    "data analytics",
+    "business optimization",
+)
+# Lookahead so overlapping keywords ("optimization" inside "business optimization") all match
+_KW_RE = re.compile("(?=(" + "|".join(map(re.escape, _KEYWORDS)) + "))", re.I)
+
+
+def _keyword_hits(text: str, limit: Optional[int] = None) -> set:
+    """Return the set of _KEYWORDS present in text, in a single linear pass.
+
+    With ``limit``, scanning stops once the first ``limit`` keywords (in _KEYWORDS order) have all
+    been seen, since the top-``limit`` result can no longer change after that.
+    """
+    matches = (m.group(1).lower() for m in _KW_RE.finditer(text))
+    needed = set(_KEYWORDS[:limit])
+    hits = set()
+    for kw in matches:
+        hits.add(kw)
+        if needed <= hits:
+            break
+    return hits
+
+
+# Visible text lives in <title> and <body>; skip the rest of <head> (meta, scripts, styles)
+_TEXT_STRAINER = SoupStrainer(["title", "body"])
+
+
+def _parse_university(html: bytes, professor_name: str) -> dict:
+    """Extract interests and a short bio snippet from a university profile page."""
+    # stripped_strings skips <script>/<style> text, so markup, attributes and URLs can't
+    # produce false interests
+    soup = BeautifulSoup(html, "lxml", parse_only=_TEXT_STRAINER)
+    strings = list(soup.stripped_strings)
+
+    # One regex pass over the visible text finds every keyword; report them in _KEYWORDS order
+    hits = _keyword_hits("\n".join(strings), limit=6)
+    found = [k.title() for k in _KEYWORDS if k in hits]
+
+    # Deduplicate while keeping order
+    interests = list(dict.fromkeys(found))[:6]
+
+    # Short snippet (optional, for debug/demo)
+    lines = (ln for text in strings for ln in text.splitlines() if ln.strip())
+    bio_snippet = "\n".join(islice(lines, 6))
+
+    return {
+        "name": professor_name,
+        "affiliation": "Saint Mary's University (Sobey School of Business)",
+        "interests": interests,
+        "publications": [],
+        "source": "university_profile",
+        "bio_snippet": bio_snippet,
+    }
+
+
 def scrape_university_profile(profile_url: str, professor_name: str) -> dict:
     """Tool: Scrape professor's public university profile page (more reliable than Scholar)."""
     print(f"\n🏫 [TOOL] Scraping university profile for {professor_name}...")
 
+    cached = _cache_get(profile_url)
+    if cached is not None:
+        print("  [TOOL] Using cached university profile")
+        cached["name"] = professor_name
+        return cached
+
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36"
-        }
-        r = requests.get(profile_url, headers=headers, timeout=15)
+        r = _HTTP.get(profile_url, timeout=15)
         r.raise_for_status()
-
-        soup = BeautifulSoup(r.text, "html.parser")
-
-        # Pull main visible text
-        text = soup.get_text("\n", strip=True)
-
-        keywords = [
-            "supply chain",
-            "logistics",
-            "revenue management",
-            "pricing",
-            "optimization",
-            "operations research",
-            "network simulation",
-            "healthcare",
-            "data analytics",
-            "business optimization",
-        ]
-        found = []
-        lower = text.lower()
-        for k in keywords:
-            if k in lower:
-                found.append(k.title())
-
-        # Deduplicate while keeping order
-        seen = set()
-        interests = []
-        for x in found:
-            if x not in seen:
-                interests.append(x)
-                seen.add(x)
-
-        # Short snippet (optional, for debug/demo)
-        lines = [ln for ln in text.splitlines() if ln.strip()]
-        bio_snippet = "\n".join(lines[0:6])
-
-        return {
-            "name": professor_name,
-            "affiliation": "Saint Mary's University (Sobey School of Business)",
-            "interests": interests[:6] if interests else [],
-            "publications": [],
-            "source": "university_profile",
-            "bio_snippet": bio_snippet,
-        }
+        research_data = _parse_university(r.content, professor_name)
+        _cache_set(profile_url, research_data)
+        return research_data
 
     except Exception as e:
         print(f"  [TOOL] University profile scrape failed: {e}")
         return {}
 
 
+# Only build the parts of the Scholar page we read (affiliation, interests, publication rows)
+# (callable class filter so multi-class elements like <a class="gsc_a_ac gs_ibl"> still match)
+_SCHOLAR_CLASSES = frozenset({"gsc_prf_il", "gsc_prf_inta", "gsc_a_tr", "gsc_a_at", "gsc_a_ac"})
+_SCHOLAR_STRAINER = SoupStrainer(
+    ["div", "a", "tr"],
+    attrs={"class": lambda v: bool(v) and not _SCHOLAR_CLASSES.isdisjoint(v.split())},
+)
+
+
+def _parse_scholar(html: bytes, professor_name: str) -> dict:
+    """Extract affiliation, interests and top publications from a Google Scholar page."""
+    soup = BeautifulSoup(html, "lxml", parse_only=_SCHOLAR_STRAINER)
+
+    research_data = {
+        "name": professor_name,
+        "affiliation": "",
+        "interests": [],
+        "publications": [],
+    }
+
+    aff = soup.find("div", {"class": "gsc_prf_il"})
+    if aff:
+        research_data["affiliation"] = aff.get_text(strip=True)
+
+    interest_links = soup.find_all("a", {"class": "gsc_prf_inta"})
+    for interest in interest_links[:5]:
+        txt = interest.get_text(strip=True)
+        if txt:
+            research_data["interests"].append(txt)
+
+    pub_rows = soup.find_all("tr", {"class": "gsc_a_tr"})[:5]
+    for row in pub_rows:
+        title_el = row.find("a", {"class": "gsc_a_at"})
+        cites_el = row.find("a", {"class": "gsc_a_ac"})
+        if title_el:
+            research_data["publications"].append(
+                {
+                    "title": title_el.get_text(strip=True),
+                    "citations": cites_el.get_text(strip=True) if cites_el else "0",
+                }
+            )
+
+    if not research_data["affiliation"]:
+        research_data["affiliation"] = "N/A"
+
+    research_data["source"] = "google_scholar"
+    return research_data
+
+
 def scrape_google_scholar(scholar_url: str, professor_name: str) -> dict:
     """Tool: Scrape professor's Google Scholar profile (best-effort, may be blocked)."""
     print(f"\n [TOOL] Scraping Google Scholar for {professor_name}...")
 
+    cached = _cache_get(scholar_url)
+    if cached is not None:
+        print(" [TOOL] Using cached Google Scholar profile")
+        cached["name"] = professor_name
+        return cached
+
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36"
-        }
-        response = requests.get(scholar_url, headers=headers, timeout=15)
+        response = _HTTP.get(scholar_url, timeout=15)
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
-
-        research_data = {
-            "name": professor_name,
-            "affiliation": "",
-            "interests": [],
-            "publications": [],
-        }
-
-        aff = soup.find("div", {"class": "gsc_prf_il"})
-        if aff:
-            research_data["affiliation"] = aff.get_text(strip=True)
-
-        interest_links = soup.find_all("a", {"class": "gsc_prf_inta"})
-        for interest in interest_links[:5]:
-            txt = interest.get_text(strip=True)
-            if txt:
-                research_data["interests"].append(txt)
-
-        pub_rows = soup.find_all("tr", {"class": "gsc_a_tr"})[:5]
-        for row in pub_rows:
-            title_el = row.find("a", {"class": "gsc_a_at"})
-            cites_el = row.find("a", {"class": "gsc_a_ac"})
-            if title_el:
-                research_data["publications"].append(
-                    {
-                        "title": title_el.get_text(strip=True),
-                        "citations": cites_el.get_text(strip=True) if cites_el else "0",
-                    }
-                )
-
-        if not research_data["affiliation"]:
-            research_data["affiliation"] = "N/A"
-
-        research_data["source"] = "google_scholar"
+        research_data = _parse_scholar(response.content, professor_name)
+        _cache_set(scholar_url, research_data)
         print(
             f" [TOOL] Found {len(research_data['interests'])} interests, {len(research_data['publications'])} publications"
         )
@@ -184,6 +330,128 @@ def scrape_google_scholar(scholar_url: str, professor_name: str) -> dict:
         }
 
 
+class _PipeliningSMTP(smtplib.SMTP_SSL):
+    """SMTP_SSL that writes MAIL/RCPT/DATA back-to-back when the server supports PIPELINING (RFC 2920)."""
+
+    def pipelined_send(self, from_addr: str, to_addrs: list, raw: bytes) -> dict:
+        """Like sendmail(): deliver an already-serialized (CRLF) message, returning refused recipients."""
+        self.ehlo_or_helo_if_needed()
+        mail_opts = ["BODY=8BITMIME"] if self.has_extn("8bitmime") else []
+        if not self.has_extn("pipelining"):
+            return self.sendmail(from_addr, to_addrs, raw, mail_opts)
+
+        # One write for the whole command group, then read the replies in order
+        commands = [" ".join([f"MAIL FROM:{smtplib.quoteaddr(from_addr)}"] + mail_opts)]
+        commands += [f"RCPT TO:{smtplib.quoteaddr(addr)}" for addr in to_addrs]
+        commands.append("DATA")
+        self.send("".join(f"{cmd}\r\n" for cmd in commands))
+        replies = [self.getreply() for _ in commands]
+
+        code, resp = replies[0]
+        if code != 250:
+            self._drain_rset()
+            raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+
+        refused = {
+            addr: reply for addr, reply in zip(to_addrs, replies[1:-1]) if reply[0] not in (250, 251)
+        }
+        if len(refused) == len(to_addrs):
+            self._drain_rset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+
+        code, resp = replies[-1]
+        if code != 354:
+            self._drain_rset()
+            raise smtplib.SMTPDataError(code, resp)
+
+        data = smtplib._quote_periods(raw)
+        if data[-2:] != smtplib.bCRLF:
+            data += smtplib.bCRLF
+        self.send(data + b"." + smtplib.bCRLF)
+        code, resp = self.getreply()
+        if code != 250:
+            self._drain_rset()
+            raise smtplib.SMTPDataError(code, resp)
+        return refused
+
+    def _drain_rset(self):
+        try:
+            self.rset()
+        except smtplib.SMTPServerDisconnected:
+            pass
+
+
+class _SMTPPool:
+    """Reusable Gmail SMTP_SSL connection: TLS handshake + AUTH happen once, not per email."""
+
+    def __init__(self, host: str = "smtp.gmail.com", port: int = 465, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._server = None
+        self._login = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _connect(self, sender_email: str, app_password: str):
+        context = ssl.create_default_context()
+        server = _PipeliningSMTP(self.host, self.port, context=context, timeout=self.timeout)
+        try:
+            server.login(sender_email, app_password)
+        except BaseException:
+            server.close()
+            raise
+        self._server = server
+        self._login = (sender_email, app_password)
+        return server
+
+    def _acquire(self, sender_email: str, app_password: str):
+        # Reuse the open connection if it belongs to the same account and is still alive
+        if self._server is not None and self._login == (sender_email, app_password):
+            try:
+                if self._server.noop()[0] == 250:
+                    return self._server
+            except (smtplib.SMTPServerDisconnected, OSError):
+                pass
+        self._drop()
+        return self._connect(sender_email, app_password)
+
+    def _drop(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                self._server.close()
+        self._server = None
+        self._login = None
+
+    def send(self, msg: EmailMessage, sender_email: str, app_password: str):
+        # Flatten once, outside the lock, with CRLF line endings as sent on the wire
+        raw = msg.as_bytes(policy=email.policy.SMTP)
+        to_addrs = [addr for _, addr in getaddresses(msg.get_all("To", []) + msg.get_all("Cc", []))]
+        with self._lock:
+            server = self._acquire(sender_email, app_password)
+            try:
+                server.pipelined_send(sender_email, to_addrs, raw)
+            except (smtplib.SMTPServerDisconnected, OSError):
+                # No resend: the server may already have queued the message (e.g. timeout after
+                # the final "."), so report the error and let the next send reconnect.
+                self._drop()
+                raise
+
+    def close(self):
+        with self._lock:
+            self._drop()
+
+
+_SMTP_POOL = _SMTPPool()
+
+
 def send_email_via_gmail(
     sender_email: str,
     app_password: str,
@@ -201,10 +469,7 @@ def send_email_via_gmail(
         msg["To"] = receiver_email
         msg.set_content(body)
 
-        context = ssl.create_default_context()
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465, context=context) as server:
-            server.login(sender_email, app_password)
-            server.send_message(msg)
+        _SMTP_POOL.send(msg, sender_email, app_password)
 
         print(" [TOOL] Email sent successfully!")
         return {"status": "success", "message": "Email sent successfully"}
@@ -217,23 +482,51 @@ def send_email_via_gmail(
 # =============================================================================
 # AGENT NODES
 # =============================================================================
-def research_agent_node(state: AgentState) -> AgentState:
+def _node_state(state: AgentState) -> AgentState:
+    """Copy of state with an empty messages list, so each node returns only its new messages.
+
+    AgentState.messages uses an operator.add reducer; returning the full history would re-append
+    it on every step and grow every checkpoint exponentially.
+    """
+    return {**state, "messages": []}
+
+
+async def _research_async(state: AgentState) -> dict:
+    """Scrape the university profile and Google Scholar concurrently."""
+    prof_name = state["professor_name"]
+    uni_url = state.get("university_profile_url", "")
+
+    async def _university() -> dict:
+        if not uni_url:
+            return {}
+        return await asyncio.to_thread(scrape_university_profile, uni_url, prof_name)
+
+    uni, scholar = await asyncio.gather(
+        _university(),
+        asyncio.to_thread(scrape_google_scholar, state["scholar_url"], prof_name),
+        return_exceptions=True,
+    )
+
+    # 1) Prefer the university profile when it yielded interests
+    if isinstance(uni, dict) and uni.get("interests"):
+        return uni
+
+    # 2) Otherwise use Scholar (which may itself be fallback data)
+    if isinstance(scholar, Exception):
+        print(f"  [TOOL] Scholar scraping failed: {scholar}")
+        return {"name": prof_name, "affiliation": "N/A", "interests": [], "publications": [], "source": "none"}
+    scholar["source"] = scholar.get("source", "google_scholar_or_fallback")
+    return scholar
+
+
+async def research_agent_node(state: AgentState) -> AgentState:
     print("\n" + "=" * 70)
     print("🔍 RESEARCH AGENT NODE")
     print("=" * 70)
 
-    prof_name = state["professor_name"]
+    state = _node_state(state)
 
-    # 1) Try university profile first
-    uni_url = state.get("university_profile_url", "")
-    research_data = {}
-    if uni_url:
-        research_data = scrape_university_profile(uni_url, prof_name)
-
-    # 2) If university scrape failed / empty, try Scholar (may fall back)
-    if not research_data or not research_data.get("interests"):
-        research_data = scrape_google_scholar(state["scholar_url"], prof_name)
-        research_data["source"] = research_data.get("source", "google_scholar_or_fallback")
+    research_data = await _research_async(state)
 
     state["research_data"] = research_data
     state["messages"].append(
@@ -247,33 +540,78 @@ def research_agent_node(state: AgentState) -> AgentState:
     return state
 
 
+@lru_cache(maxsize=2)
+def _build_llm(provider: str, api_key: str):
+    """Build the chat client once per (provider, key) so its HTTP connection pool is reused."""
+    # Provider SDKs are imported lazily so only the configured one is loaded
+    if provider == "anthropic":
+        from langchain_anthropic import ChatAnthropic
+
+        return ChatAnthropic(model="claude-sonnet-4-20250514", temperature=0.7, api_key=api_key)
+
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(model="gpt-4o-mini", temperature=0.7, api_key=api_key)
+
+
 def _pick_llm():
     """Prefer Anthropic if present, else OpenAI; else None."""
     anthropic_key = os.getenv("ANTHROPIC_API_KEY")
     openai_key = os.getenv("OPENAI_API_KEY")
 
     if anthropic_key:
-        return ChatAnthropic(model="claude-sonnet-4-20250514", temperature=0.7, api_key=anthropic_key)
+        return _build_llm("anthropic", anthropic_key)
 
     if openai_key:
-        return ChatOpenAI(model="gpt-4o-mini", temperature=0.7, api_key=openai_key)
+        return _build_llm("openai", openai_key)
 
     return None
 
 
+# Template placeholders the LLM sometimes leaves behind, e.g. "[Your Name]" or "[Contact Information]"
+_PLACEHOLDER_RE = re.compile(r"\[(?:your\s+[^\]]*|contact\s+information)\]", re.I)
+
+# Used when no LLM is configured or the LLM output fails the placeholder check
+_FALLBACK_SUBJECT = "Prospective PhD Student – Interest in Supply Chain & Revenue Management"
+_FALLBACK_TEMPLATE = """Dear Professor {name},
+
+I am Mina Tavakkoli Jouybari, currently completing my Master's degree in Business Analytics. My thesis focuses on supply chain optimization using machine learning techniques, which has equipped me with strong skills in optimization, statistical modeling, and data analysis.
+
+I am particularly interested in your work in {interests}, especially your publication “{pub}.” I believe my background aligns well with your research interests and I am eager to explore potential PhD opportunities in your group.
+
+Could we schedule a 15–20 minute meeting to discuss how my interests might align with your ongoing projects?
+
+Best regards,  
+Mina Tavakkoli Jouybari
+"""
+
+# "SUBJECT: ... --- BODY: ..." as requested in the prompt's output format. Labels may come back
+# Markdown-bolded; the subject is kept to one line since header values can't contain linefeeds.
+_EMAIL_RE = re.compile(
+    r"[*_]*SUBJECT:[*_]*[ \t]*(?P<subj>[^\r\n]+?)\s*(?:---\s*)?[*_]*BODY:[*_]*(?P<body>(?s:.*))"
+)
+_STRAY_LINE_RE = re.compile(r"^[ \t]*(?:subject:[^\r\n]*|---[ \t]*)\r?(?:\n|$)", re.I | re.M)
+
+
 def email_composer_agent_node(state: AgentState) -> AgentState:
     print("\n" + "=" * 70)
     print("  EMAIL COMPOSER AGENT NODE")
     print("=" * 70)
 
+    state = _node_state(state)
+
     research_data = state["research_data"]
     llm = _pick_llm()
 
-    interests = research_data.get("interests", [])
-    interests_str = ", ".join(interests) if interests else "N/A"
+    name = research_data["name"]
+    interests = research_data.get("interests") or []
+    interests_str = ", ".join(interests) or "N/A"
+    interests_head = ", ".join(interests[:2]) or "your research area"
 
-    top_pub_title = research_data["publications"][0]["title"] if research_data.get("publications") else "N/A"
-    top_pub_cites = research_data["publications"][0]["citations"] if research_data.get("publications") else "0"
+    top = (research_data.get("publications") or [{}])[0]
+    top_pub_title = top.get("title", "N/A")
+    top_pub_cites = top.get("citations", "0")
+    fallback_fields = {"name": name, "interests": interests_head, "pub": top_pub_title}
 
     prompt = f"""
 You are writing a short, high-quality PhD interest email.
@@ -289,7 +627,7 @@ Hard rules:
 - Output must follow the exact format below.
 
 Professor information:
-- Name: {research_data['name']}
+- Name: {name}
 - Affiliation: {research_data.get('affiliation', 'N/A')}
 - Research Interests: {interests_str}
 - Publication to reference: {top_pub_title} ({top_pub_cites} citations)
@@ -305,18 +643,8 @@ BODY:
 """
 
     if llm is None:
-        subject = "Prospective PhD Student – Interest in Supply Chain & Revenue Management"
-        body = f"""Dear Professor {research_data['name']},
-
-I am Mina Tavakkoli Jouybari, currently completing my Master's degree in Business Analytics. My thesis focuses on supply chain optimization using machine learning techniques, which has equipped me with strong skills in optimization, statistical modeling, and data analysis.
-
-I am particularly interested in your work in {', '.join(interests[:2]) if interests else 'your research area'}, especially your publication “{top_pub_title}.” I believe my background aligns well with your research interests and I am eager to explore potential PhD opportunities in your group.
-
-Could we schedule a 15–20 minute meeting to discuss how my interests might align with your ongoing projects?
-
-Best regards,  
-Mina Tavakkoli Jouybari
-"""
+        subject = _FALLBACK_SUBJECT
+        body = _FALLBACK_TEMPLATE.format_map(fallback_fields)
         state["email_subject"] = subject
         state["email_body"] = body
         state["messages"].append(AIMessage(content=f"Email composed (fallback) with subject: {subject[:50]}..."))
@@ -332,39 +660,21 @@ Mina Tavakkoli Jouybari
     response = llm.invoke(messages)
     email_text = response.content if isinstance(response.content, str) else str(response.content)
 
-    if "SUBJECT:" in email_text and "BODY:" in email_text:
-        parts = email_text.split("---", 1)
-        subject_part = parts[0].replace("SUBJECT:", "").strip()
-        body_part = parts[1].split("BODY:", 1)[-1].strip()
+    m = _EMAIL_RE.search(email_text)
+    if m:
+        subject_part = m.group("subj").strip()
+        body_part = m.group("body").strip()
     else:
-        subject_part = "Prospective PhD Student – Interest in Supply Chain & Revenue Management"
-        body_part = email_text.strip()
-
-    # Remove any accidental SUBJECT lines inside body
-    body_lines = []
-    for line in body_part.splitlines():
-        if line.strip().lower().startswith("subject:"):
-            continue
-        if line.strip() == "---":
-            continue
-        body_lines.append(line)
-    body_part = "\n".join(body_lines).strip()
-
-    # Safety: reject placeholders
-    banned_tokens = ["[Your Name]", "[Your Full Name]", "[Contact Information]", "["]
-    if any(tok in body_part for tok in banned_tokens):
-        subject_part = "Prospective PhD Student – Interest in Supply Chain & Revenue Management"
-        body_part = f"""Dear Professor {research_data['name']},
-
-I am Mina Tavakkoli Jouybari, currently completing my Master's degree in Business Analytics. My thesis focuses on supply chain optimization using machine learning techniques, which has equipped me with strong skills in optimization, statistical modeling, and data analysis.
+        subject_part = _FALLBACK_SUBJECT
+        body_part = email_text
 
-I am particularly interested in your work in {', '.join(interests[:2]) if interests else 'your research area'}, especially your publication “{top_pub_title}.” I believe my background aligns well with your research interests and I am eager to explore potential PhD opportunities in your group.
+    # Remove any accidental SUBJECT lines / "---" separators inside body
+    body_part = _STRAY_LINE_RE.sub("", body_part).strip()
 
-Could we schedule a 15–20 minute meeting to discuss how my interests might align with your ongoing projects?
-
-Best regards,  
-Mina Tavakkoli Jouybari
-"""
+    # Safety: reject placeholders
+    if _PLACEHOLDER_RE.search(body_part):
+        subject_part = _FALLBACK_SUBJECT
+        body_part = _FALLBACK_TEMPLATE.format_map(fallback_fields)
 
     state["email_subject"] = subject_part
     state["email_body"] = body_part
@@ -373,11 +683,95 @@ Mina Tavakkoli Jouybari
     return state
 
 
-def human_approval_node(state: AgentState) -> AgentState:
+# thread_id -> Future awaited by human_approval_node when REMOTE_APPROVAL is set
+PENDING_DECISIONS: dict = {}
+_DEFAULT_APPROVAL_TIMEOUT = 3600.0
+
+
+def _approval_timeout() -> Optional[float]:
+    """Seconds to wait for a remote decision: APPROVAL_TIMEOUT (<= 0 waits forever), default 1h."""
+    raw = os.getenv("APPROVAL_TIMEOUT", "").strip()
+    if not raw:
+        return _DEFAULT_APPROVAL_TIMEOUT
+    try:
+        timeout = float(raw)
+        if math.isnan(timeout):
+            raise ValueError(raw)
+    except ValueError:
+        print(f"  WARNING: Invalid APPROVAL_TIMEOUT={raw!r}; using {_DEFAULT_APPROVAL_TIMEOUT:.0f}s")
+        return _DEFAULT_APPROVAL_TIMEOUT
+    return timeout if timeout > 0 else None
+
+
+def submit_decision(thread_id: str, decision: str) -> bool:
+    """Resolve a pending remote approval ("yes"/"no"), e.g. from a REST handler. Thread-safe."""
+    fut = PENDING_DECISIONS.get(thread_id)
+    if fut is None or fut.done():
+        return False
+    decision = decision.strip().lower()
+    fut.get_loop().call_soon_threadsafe(lambda: fut.done() or fut.set_result(decision))
+    return True
+
+
+def _read_line(prompt: str) -> str:
+    """input() replacement that reads the raw stdin fd, so a blocked read holds no buffer lock."""
+    try:
+        fd = sys.stdin.fileno()
+    except (AttributeError, OSError, ValueError):
+        return input(prompt)
+    print(prompt, end="", flush=True)
+    buf = b""
+    while not buf.endswith(b"\n"):
+        chunk = os.read(fd, 1)
+        if not chunk:
+            raise EOFError
+        buf += chunk
+    return buf.decode(errors="replace")
+
+
+def _prompt_decision() -> str:
+    while True:
+        decision = _read_line("\n✋ Do you approve sending this email? (yes/no): ").strip().lower()
+        if decision in ["yes", "y", "no", "n"]:
+            return decision
+        print("Please enter 'yes' or 'no'")
+
+
+def _prompt_decision_async(loop: asyncio.AbstractEventLoop) -> asyncio.Future:
+    """Run _prompt_decision on a daemon thread and resolve the returned Future on the loop.
+
+    A daemon thread (not the default executor) so Ctrl-C can exit while the read is still blocked:
+    asyncio.run() shutdown and interpreter exit both join executor threads.
+    """
+    fut = loop.create_future()
+
+    def _resolve(setter, value):
+        if not fut.done():
+            setter(value)
+
+    def _read():
+        try:
+            decision = _prompt_decision()
+        except BaseException as e:  # EOFError etc. must surface in the node, not die in the thread
+            callback = (_resolve, fut.set_exception, e)
+        else:
+            callback = (_resolve, fut.set_result, decision)
+        try:
+            loop.call_soon_threadsafe(*callback)
+        except RuntimeError:
+            pass  # loop already closed (run was interrupted)
+
+    threading.Thread(target=_read, name="approval-prompt", daemon=True).start()
+    return fut
+
+
+async def human_approval_node(state: AgentState, config: RunnableConfig) -> AgentState:
     print("\n" + "=" * 70)
     print(" HUMAN-IN-THE-LOOP APPROVAL NODE")
     print("=" * 70)
 
+    state = _node_state(state)
+
     print("\n📧 EMAIL PREVIEW:")
     print(f"\nSUBJECT: {state['email_subject']}")
     print("\n" + "-" * 70)
@@ -391,19 +785,38 @@ def human_approval_node(state: AgentState) -> AgentState:
         print(" Email auto-approved!")
         return state
 
-    while True:
-        decision = input("\n✋ Do you approve sending this email? (yes/no): ").strip().lower()
-        if decision in ["yes", "y"]:
-            state["human_approved"] = True
-            state["messages"].append(HumanMessage(content="Email approved by human"))
-            print(" Email approved!")
-            break
-        if decision in ["no", "n"]:
-            state["human_approved"] = False
-            state["messages"].append(HumanMessage(content="Email rejected by human"))
-            print(" Email rejected.")
-            break
-        print("Please enter 'yes' or 'no'")
+    remote = os.getenv("REMOTE_APPROVAL", "").lower() in {"1", "true", "yes", "y"}
+    loop = asyncio.get_running_loop()
+
+    if remote:
+        # Wait for submit_decision(thread_id, ...) without blocking the event loop
+        thread_id = config["configurable"]["thread_id"]
+        timeout = _approval_timeout()
+        fut = loop.create_future()
+        PENDING_DECISIONS[thread_id] = fut
+        print(f"\n✋ Waiting for remote approval (thread_id={thread_id})...")
+        try:
+            decision = await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            decision = None
+        finally:
+            PENDING_DECISIONS.pop(thread_id, None)
+    else:
+        # Blocking input() runs off the event loop so other graph runs keep progressing
+        decision = await _prompt_decision_async(loop)
+
+    if decision in ["yes", "y"]:
+        state["human_approved"] = True
+        state["messages"].append(HumanMessage(content="Email approved by human"))
+        print(" Email approved!")
+    elif decision is None:
+        state["human_approved"] = False
+        state["messages"].append(HumanMessage(content="Email rejected (approval timed out)"))
+        print(" Approval timed out; email not sent.")
+    else:
+        state["human_approved"] = False
+        state["messages"].append(HumanMessage(content="Email rejected by human"))
+        print(" Email rejected.")
 
     return state
 
@@ -413,6 +826,8 @@ def email_sender_node(state: AgentState) -> AgentState:
     print(" EMAIL SENDER NODE")
     print("=" * 70)
 
+    state = _node_state(state)
+
     result = send_email_via_gmail(
         state["sender_email"],
         state["app_password"],
@@ -440,6 +855,7 @@ def should_send_email(state: AgentState) -> Literal["send_email", "end"]:
 # BUILD THE LANGGRAPH WORKFLOW
 # =============================================================================
 def create_phd_agent_graph():
+    """Compile the workflow. Research and approval nodes are async: run it with ainvoke/astream."""
     workflow = StateGraph(AgentState)
 
     workflow.add_node("research_agent", research_agent_node)
@@ -467,6 +883,27 @@ def create_phd_agent_graph():
 # =============================================================================
 # MAIN EXECUTION
 # =============================================================================
+async def run_many(profs: list, concurrency: int = 10) -> list:
+    """Run the workflow for many professors concurrently (one initial AgentState per professor).
+
+    The compiled graph, HTTP session, SMTP connection and LLM client are shared by all runs.
+    Use AUTO_APPROVE or REMOTE_APPROVAL, since concurrent runs can't share one stdin prompt.
+    Each run gets thread_id "<index>:<professor_name>" (the key for submit_decision), so
+    duplicate names never share a checkpoint thread or a pending approval.
+    Returns the final states in input order; a failed run yields its exception instead.
+    """
+    app = create_phd_agent_graph()
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int, p: dict):
+        async with sem:
+            thread_id = f"{i}:{p['professor_name']}"
+            return await app.ainvoke(p, {"configurable": {"thread_id": thread_id}})
+
+    with _SMTP_POOL:
+        return await asyncio.gather(*(one(i, p) for i, p in enumerate(profs)), return_exceptions=True)
+
+
 def main():
     print(
         """
@@ -523,7 +960,9 @@ given me hands-on experience with both theoretical and practical aspects of oper
     config = {"configurable": {"thread_id": "phd_email_001"}}
 
     try:
-        final_state = app.invoke(initial_state, config)
+        # The SMTP connection stays open for the whole run and is closed when the graph finishes
+        with _SMTP_POOL:
+            final_state = asyncio.run(app.ainvoke(initial_state, config))
 
         print("\n" + "=" * 70)
         print("🎉 WORKFLOW EXECUTION COMPLETE")